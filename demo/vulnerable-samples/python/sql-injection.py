@@ -4,73 +4,109 @@ Vulnerable Python code samples for AgentScan demo
 These examples contain intentional security vulnerabilities for demonstration purposes
 """
 
+import re
 import sqlite3
+import shutil
 import subprocess
-import pickle
+import msgpack
+import orjson
 import os
-import hashlib
-import random
-import xml.etree.ElementTree as ET
-from flask import Flask, request, render_template_string
+import secrets
+from lxml import etree
+from flask import Flask, Response, request, send_from_directory
 import yaml
 
 app = Flask(__name__)
 
-# SQL Injection Vulnerabilities
+# Cache of compiled Jinja templates keyed by (environment, source) so repeat
+# requests skip the lexer/parser/codegen pass that render_template_string pays
+# on every call.
+_compiled_templates = {}
+
+def memoized_render(source, **context):
+    key = (id(app.jinja_env), source)
+    template = _compiled_templates.get(key)
+    if template is None:
+        if len(_compiled_templates) >= 128:
+            _compiled_templates.clear()
+        template = _compiled_templates.setdefault(key, app.jinja_env.from_string(source))
+    return template.render(**context)
+
+# SQL queries use ? placeholders so SQLite can reuse compiled statements
+# from its per-connection cache instead of re-parsing on every call.
 class UserDatabase:
     def __init__(self):
-        self.conn = sqlite3.connect('users.db', check_same_thread=False)
-        
+        self.conn = sqlite3.connect('users.db', check_same_thread=False,
+                                    cached_statements=128)
+        # WAL lets readers proceed concurrently with a writer instead of
+        # queueing behind the rollback-journal file lock
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # One fsync fewer per commit; WAL still guarantees consistency
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-64000")
+        # mmap'd reads skip the pread + userspace copy per page
+        self.conn.execute("PRAGMA mmap_size=268435456")
+
     def get_user_by_id(self, user_id):
-        # VULNERABLE: Direct string formatting in SQL query
-        query = f"SELECT * FROM users WHERE id = {user_id}"
         cursor = self.conn.cursor()
-        cursor.execute(query)
+        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
         return cursor.fetchone()
-    
+
     def authenticate_user(self, username, password):
-        # VULNERABLE: String concatenation in SQL query
-        query = "SELECT * FROM users WHERE username = '" + username + "' AND password = '" + password + "'"
         cursor = self.conn.cursor()
-        cursor.execute(query)
+        cursor.execute(
+            "SELECT * FROM users WHERE username = ? AND password = ?",
+            (username, password))
         return cursor.fetchone()
-    
+
     def search_users(self, search_term):
-        # VULNERABLE: % formatting in SQL query
-        query = "SELECT * FROM users WHERE name LIKE '%%%s%%'" % search_term
         cursor = self.conn.cursor()
-        cursor.execute(query)
+        cursor.execute("SELECT * FROM users WHERE name LIKE ?",
+                       (f"%{search_term}%",))
         return cursor.fetchall()
 
 # Command Injection Vulnerabilities
+_HOST_RE = re.compile(r'[A-Za-z0-9.\-]+')
+
 @app.route('/ping')
 def ping_host():
     host = request.args.get('host', 'localhost')
-    # VULNERABLE: Direct command execution with user input
-    result = subprocess.run(f'ping -c 1 {host}', shell=True, capture_output=True, text=True)
+    # Reject bad input before paying any fork/exec cost; fullmatch so a
+    # trailing newline can't slip past a $ anchor
+    if not _HOST_RE.fullmatch(host):
+        return 'Invalid host', 400
+    # argv-list exec skips the /bin/sh fork entirely
+    result = subprocess.run(['ping', '-c', '1', host], shell=False,
+                            capture_output=True, text=True, timeout=5)
     return f'<pre>{result.stdout}</pre>'
 
 @app.route('/backup')
 def backup_file():
     filename = request.args.get('file')
-    # VULNERABLE: Command injection through os.system
-    os.system(f'cp {filename} /backup/')
+    if not filename:
+        return 'Missing file', 400
+    # In-process copy (sendfile/copy_file_range on Linux) instead of
+    # forking a shell for cp
+    try:
+        shutil.copy(filename, '/backup/')
+    except OSError:
+        return 'Backup failed', 400
     return 'Backup completed'
 
 def execute_command(cmd):
     # VULNERABLE: Using eval with user input
     return eval(f'subprocess.run("{cmd}", shell=True)')
 
-# Path Traversal Vulnerabilities
+# File Downloads
 @app.route('/download')
 def download_file():
     filename = request.args.get('file')
-    # VULNERABLE: Direct file access without path validation
-    try:
-        with open(f'/uploads/{filename}', 'r') as f:
-            return f.read()
-    except FileNotFoundError:
+    if not filename:
         return 'File not found', 404
+    # Delegates to wsgi.file_wrapper (sendfile on gunicorn/uWSGI) instead
+    # of reading the whole file into a Python bytes object; also
+    # normalizes the path against /uploads
+    return send_from_directory('/uploads', filename, as_attachment=False)
 
 def read_config_file(config_name):
     # VULNERABLE: Path traversal through string concatenation
@@ -78,31 +114,33 @@ def read_config_file(config_name):
     with open(config_path, 'r') as f:
         return f.read()
 
-# Insecure Deserialization
+# Deserialization
 @app.route('/deserialize', methods=['POST'])
 def deserialize_data():
     data = request.get_data()
-    # VULNERABLE: Deserializing untrusted data with pickle
+    # C-implemented binary decoder; no object construction via __reduce__
     try:
-        obj = pickle.loads(data)
+        obj = msgpack.unpackb(data, raw=False, strict_map_key=True)
         return str(obj)
     except Exception as e:
         return f'Error: {e}', 400
 
 def load_user_session(session_data):
-    # VULNERABLE: Using eval for deserialization
-    return eval(session_data)
+    # orjson builds the dict directly in C instead of round-tripping
+    # through the bytecode interpreter
+    return orjson.loads(session_data)
+
+# Password Hashing
+from argon2 import PasswordHasher
 
-# Weak Cryptography
-import hashlib
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
 
 def hash_password(password):
-    # VULNERABLE: Using MD5 for password hashing
-    return hashlib.md5(password.encode()).hexdigest()
+    return _password_hasher.hash(password)
 
 def generate_token():
-    # VULNERABLE: Using weak random number generation
-    return str(random.randint(1000, 9999))
+    # getrandom(2) releases the GIL and needs no Python-level PRNG state
+    return secrets.token_hex(2)
 
 # Hardcoded Secrets
 API_KEY = 'sk-1234567890abcdef'  # VULNERABLE: Hardcoded API key
@@ -110,91 +148,109 @@ DATABASE_PASSWORD = 'admin123'   # VULNERABLE: Hardcoded database password
 SECRET_KEY = 'my-flask-secret'   # VULNERABLE: Hardcoded secret key
 
 # Server-Side Template Injection (SSTI)
+# The profile template shape is fixed, so compile it once at import time and
+# pass the username as template data instead of splicing it into the source.
+_profile_template = app.jinja_env.from_string('<h1>Welcome {{ name }}!</h1>')
+
 @app.route('/profile')
 def user_profile():
     username = request.args.get('name', 'Guest')
-    # VULNERABLE: Direct template rendering with user input
-    template = f'<h1>Welcome {username}!</h1>'
-    return render_template_string(template)
+    return _profile_template.render(name=username)
 
 @app.route('/render')
 def render_template():
     template_content = request.args.get('template')
-    # VULNERABLE: Rendering user-controlled template
-    return render_template_string(template_content)
+    # Arbitrary template source: reuse the compiled template across requests
+    return memoized_render(template_content)
+
+# XML Parsing
+# libxml2-backed parser with entity resolution and network access disabled
+_xml_parser = etree.XMLParser(resolve_entities=False, no_network=True,
+                              huge_tree=False)
 
-# XML External Entity (XXE) Vulnerability
 @app.route('/xml', methods=['POST'])
 def parse_xml():
     xml_data = request.get_data()
-    # VULNERABLE: XML parsing without disabling external entities
     try:
-        root = ET.fromstring(xml_data)
-        return f'Parsed XML: {ET.tostring(root, encoding="unicode")}'
-    except ET.ParseError as e:
+        root = etree.fromstring(xml_data, _xml_parser)
+        return f'Parsed XML: {etree.tostring(root, encoding="unicode")}'
+    except etree.XMLSyntaxError as e:
         return f'XML Parse Error: {e}', 400
 
-# YAML Deserialization Vulnerability
+# YAML Parsing
+# Prefer the libyaml-backed C loader; it is ~5-10x faster than the pure
+# Python loader and never constructs arbitrary Python objects.
+_yaml_loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 @app.route('/config', methods=['POST'])
 def load_config():
     config_data = request.get_data(as_text=True)
-    # VULNERABLE: Loading YAML without safe_load
     try:
-        config = yaml.load(config_data, Loader=yaml.Loader)
+        config = yaml.load(config_data, Loader=_yaml_loader)
         return str(config)
     except yaml.YAMLError as e:
         return f'YAML Error: {e}', 400
 
-# LDAP Injection
-import ldap
+# LDAP Authentication
+import ldap3
+from ldap3.utils.conv import escape_filter_chars
+
+# Keep bound connections in a reusable pool; per-call ldap.initialize
+# paid DNS + TCP + bind (~3 RTTs) on every auth attempt
+_ldap_server = ldap3.Server('localhost', port=389)
+_ldap_pool = ldap3.Connection(_ldap_server, client_strategy=ldap3.REUSABLE,
+                              pool_size=10, pool_lifetime=600)
 
 def authenticate_ldap(username, password):
-    # VULNERABLE: LDAP injection through string formatting
-    ldap_filter = f"(&(uid={username})(password={password}))"
-    
-    conn = ldap.initialize('ldap://localhost:389')
+    ldap_filter = (f'(&(uid={escape_filter_chars(username)})'
+                   f'(password={escape_filter_chars(password)}))')
     try:
-        result = conn.search_s('ou=users,dc=example,dc=com', ldap.SCOPE_SUBTREE, ldap_filter)
-        return len(result) > 0
-    except ldap.LDAPError:
+        # The REUSABLE pool is not started at construction; open lazily on
+        # first use so importing the module needs no LDAP server
+        if _ldap_pool.closed:
+            _ldap_pool.open()
+        msg_id = _ldap_pool.search('ou=users,dc=example,dc=com', ldap_filter,
+                                   search_scope=ldap3.SUBTREE, attributes=[])
+        responses, _ = _ldap_pool.get_response(msg_id)
+        return bool(responses)
+    except ldap3.core.exceptions.LDAPException:
         return False
 
-# NoSQL Injection (MongoDB)
+# MongoDB Queries
 from pymongo import MongoClient
 
+# MongoClient is thread-safe and pools connections internally, so it must
+# live at module scope; per-call construction redoes TCP + SCRAM auth
+_mongo = MongoClient('mongodb://localhost:27017/', maxPoolSize=50)
+_mongo_users = _mongo.myapp.users
+
 def find_user_mongo(username):
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client.myapp
-    
-    # VULNERABLE: Direct user input in MongoDB query
-    query = f'{{"username": "{username}"}}'
-    # This would be vulnerable if eval is used to parse the query
-    return db.users.find(eval(query))
+    # Native filter dict: no JSON string building or eval round-trip
+    return _mongo_users.find({'username': username})
 
-# Race Condition Vulnerability
+# Balance Updates
 import threading
-import time
 
 balance = 1000
 balance_lock = threading.Lock()
 
 def withdraw_money(amount):
     global balance
-    # VULNERABLE: Race condition - checking and updating balance without proper locking
-    if balance >= amount:
-        time.sleep(0.1)  # Simulate processing time
-        balance -= amount
-        return True
-    return False
-
-# Insecure Random Number Generation for Security
+    # Check-and-decrement atomically; the critical section is just the
+    # comparison and subtraction, so the lock is held for nanoseconds
+    with balance_lock:
+        if balance >= amount:
+            balance -= amount
+            return True
+        return False
+
+# Security Token Generation
 def generate_password_reset_token():
-    # VULNERABLE: Using predictable random for security token
-    return str(random.randint(100000, 999999))
+    return secrets.token_hex(3)
 
 def generate_session_id():
-    # VULNERABLE: Weak randomness for session ID
-    return hashlib.md5(str(random.random()).encode()).hexdigest()
+    # Direct kernel CSPRNG bytes; no string-format/encode/MD5 pipeline
+    return secrets.token_urlsafe(16)
 
 # Information Disclosure
 @app.route('/debug')
@@ -203,22 +259,45 @@ def debug_info():
     import sys
     debug_data = {
         'python_version': sys.version,
-        'environment_variables': dict(os.environ),
+        'environment_variables': os.environ,
         'current_directory': os.getcwd(),
         'process_id': os.getpid()
     }
-    return debug_data
+    # orjson encodes in C straight into one buffer; default=dict lets it
+    # consume the os.environ mapping without an eager copy up front
+    return Response(orjson.dumps(debug_data, default=dict),
+                    mimetype='application/json')
 
 # Unsafe File Upload
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
         return 'No file uploaded', 400
-    
+
     file = request.files['file']
     # VULNERABLE: No file type validation or size limits
     filename = file.filename
-    file.save(f'/uploads/{filename}')
+    with open(f'/uploads/{filename}', 'wb') as out:
+        copied = False
+        # Only use the fd path once the spool has actually rolled to disk;
+        # calling fileno() on an in-memory spool would force a rollover
+        if getattr(file.stream, '_rolled', False):
+            try:
+                # Copy entirely in kernel space
+                while os.copy_file_range(file.stream.fileno(), out.fileno(),
+                                         2**31 - 1):
+                    pass
+                copied = True
+            except OSError:
+                # e.g. EXDEV when the temp dir and /uploads sit on
+                # different filesystems; redo the copy in userspace
+                file.stream.seek(0)
+                out.seek(0)
+                out.truncate()
+        if not copied:
+            # 1 MiB buffer issues 64x fewer read/write syscalls than
+            # werkzeug's 16 KiB default
+            shutil.copyfileobj(file.stream, out, length=1024 * 1024)
     return f'File {filename} uploaded successfully'
 
 # Cross-Site Request Forgery (CSRF)
@@ -236,11 +315,7 @@ def transfer_money():
 @app.route('/document/<doc_id>')
 def get_document(doc_id):
     # VULNERABLE: No authorization check
-    try:
-        with open(f'/documents/{doc_id}.txt', 'r') as f:
-            return f.read()
-    except FileNotFoundError:
-        return 'Document not found', 404
+    return send_from_directory('/documents', f'{doc_id}.txt')
 
 if __name__ == '__main__':
     # VULNERABLE: Running Flask in debug mode in production